@@ -1,36 +1,642 @@
+from __future__ import annotations
+
 import os
+import re
 import sys
+import copy
+import json
+import hashlib
 import argparse
+import functools
+import textwrap
+import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Union
-
-from dotenv import load_dotenv
-import plexapi.exceptions
-from plexapi.server import PlexServer
-from plexapi.library import LibrarySection
-from plexapi.collection import Collection
-from plexapi.video import Movie, Show
-from plexapi.media import Field, Guid
-import requests
-from tqdm import tqdm
+from typing import TYPE_CHECKING, Iterable, Iterator, TextIO, TypeVar, Union
+
 import yaml
+try:
+    # LibYAML C bindings, much faster than the pure Python loader and dumper
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+if TYPE_CHECKING:
+    # plexapi, requests, dotenv and tqdm are slow to import, so they are only imported where they're used
+    from plexapi.library import LibrarySection
+    from plexapi.collection import Collection
+    from plexapi.video import Movie, Show
+    from plexapi.media import Guid
+    from plexapi.server import PlexServer
+    import requests
+    from tqdm import tqdm
+
+
+_T = TypeVar("_T")
+
+_REQUIRED_ENV_VARS = frozenset({"PLEX_TOKEN"})
+# Local ip first, then the public ip as a fallback
+_IP_ENV_VARS = ("PLEX_SERVER_IP", "PLEX_SERVER_PUBLIC_IP")
+
+_URL_SCHEMES = ("http://", "https://")
+
+_CONFIG_CACHE_DIR = Path.home() / ".cache" / "plex-collection-maker"
+
+# Parsed YAML files, {path: (mtime in ns, size, parsed YAML)}, least recently used first
+_yaml_cache: "OrderedDict[str, tuple[int, int, dict]]" = OrderedDict()
+_YAML_CACHE_SIZE = 100
+
+
+def _json_sidecar_path(path: str) -> Path:
+    """
+    Get the JSON copy of a YAML file, kept in the cache directory.
+
+    Args:
+        path (str): Path to the YAML file.
+
+    Returns:
+        Path: Path to the JSON sidecar file.
+    """
+    return _CONFIG_CACHE_DIR / f'{hashlib.md5(os.path.abspath(path).encode("utf-8")).hexdigest()}.json'
+
+
+def _read_json_sidecar(path: str, stat: os.stat_result) -> "Union[dict, None]":
+    """
+    Load the JSON copy of a YAML file, JSON parses much faster than YAML (fastest with orjson).
+
+    Args:
+        path (str): Path to the YAML file.
+        stat (os.stat_result): Current stat of the YAML file.
+
+    Returns:
+        dict | None: Parsed YAML, None if there is no up to date JSON copy.
+    """
+    try:
+        with open(_json_sidecar_path(path), "rb") as f:
+            sidecar = orjson.loads(f.read()) if orjson is not None else json.loads(f.read())
+    except (OSError, ValueError):
+        # orjson.JSONDecodeError and json.JSONDecodeError are both ValueErrors
+        return None
+    if not isinstance(sidecar, dict):
+        return None
+    if sidecar.get("mtime_ns") != stat.st_mtime_ns or sidecar.get("size") != stat.st_size:
+        return None
+    return sidecar.get("data")
+
+
+def _write_json_sidecar(path: str, stat: os.stat_result, parsed: dict) -> None:
+    """
+    Save a JSON copy of a parsed YAML file for faster loading next time.
+
+    Args:
+        path (str): Path to the YAML file.
+        stat (os.stat_result): Stat of the YAML file when it was parsed.
+        parsed (dict): Parsed YAML.
+    """
+    sidecar = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "data": parsed}
+    try:
+        if orjson is not None:
+            data = orjson.dumps(sidecar)
+        else:
+            data = json.dumps(sidecar, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    except (TypeError, ValueError):
+        # Not representable in JSON
+        return
+    if (orjson.loads(data) if orjson is not None else json.loads(data))["data"] != parsed:
+        # YAML types that don't survive the round trip (e.g. dates, non-string keys), always parse the YAML
+        return
+    try:
+        os.makedirs(_CONFIG_CACHE_DIR, exist_ok=True)
+        with open(_json_sidecar_path(path), "wb") as f:
+            f.write(data)
+    except OSError:
+        # Caching is only an optimization, carry on without it
+        pass
+
+
+def _load_yaml_cached(path: str) -> dict:
+    """
+    Load a YAML file, reusing the previously parsed result if the file is unchanged.
+
+    Args:
+        path (str): Path to the YAML file.
+
+    Raises:
+        yaml.YAMLError: if the file is not valid YAML
+
+    Returns:
+        dict: Parsed YAML. A freshly parsed file is also kept in the cache and shouldn't be mutated,
+            a cached result is returned as a copy.
+    """
+    stat = os.stat(path)
+    cached = _yaml_cache.get(path)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        _yaml_cache.move_to_end(path)
+        return copy.deepcopy(cached[2])
+
+    parsed = _read_json_sidecar(path, stat)
+    if parsed is None:
+        # Let the loader decode the raw bytes, it detects the encoding from the BOM and defaults to UTF-8
+        with open(path, "rb") as yaml_file:
+            parsed = yaml.load(yaml_file.read(), Loader=SafeLoader)
+        _write_json_sidecar(path, stat, parsed)
+    _yaml_cache[path] = (stat.st_mtime_ns, stat.st_size, parsed)
+    _yaml_cache.move_to_end(path)
+    if len(_yaml_cache) > _YAML_CACHE_SIZE:
+        _yaml_cache.popitem(last=False)
+    return parsed
+
+
+# Connected Plex servers and their sessions, {(ip, public ip, token, cache responses): (server, session)}
+_plex_server_cache: "dict[tuple[str, Union[str, None], str, bool], tuple[PlexServer, requests.Session]]" = {}
+
+_SYNC_STATE_FILE = Path("./.pcm_state.json")
+_RESPONSE_CACHE_NAME = ".plex_cache"  # requests-cache adds the .sqlite extension
+
+
+def _read_sync_state() -> "dict[str, dict[str, dict]]":
+    """
+    Load the state of the collections as of the last sync.
+
+    Returns:
+        dict[str, dict[str, dict]]: {library name: {collection title: collection state}}
+    """
+    try:
+        with open(_SYNC_STATE_FILE, "rb") as f:
+            sync_state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Start over if a hand edited file doesn't hold {library name: {collection title: collection state}}
+    if not isinstance(sync_state, dict) or not all(
+        isinstance(lib_state, dict) and all(isinstance(state, dict) for state in lib_state.values())
+        for lib_state in sync_state.values()
+    ):
+        return {}
+    return sync_state
+
+
+def _write_sync_state(sync_state: "dict[str, dict[str, dict]]") -> None:
+    """
+    Save the state of the synced collections for the next run.
+
+    Args:
+        sync_state (dict[str, dict[str, dict]]): {library name: {collection title: collection state}}
+    """
+    try:
+        with open(_SYNC_STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump(sync_state, f)
+    except OSError:
+        pass
+
+
+def _poster_hash(poster: str) -> str:
+    """
+    Identify a poster, to detect a changed poster without uploading it.
+
+    Args:
+        poster (str): Poster URL or file path from a collection config.
+
+    Returns:
+        str: Hash of the URL, or of the file path and modification time since replacing the file keeps the same path
+    """
+    if not poster.startswith(_URL_SCHEMES) and os.path.exists(poster):
+        poster = f"{poster}:{os.stat(poster).st_mtime_ns}"
+    return hashlib.sha256(poster.encode("utf-8")).hexdigest()
+
+
+def _collection_state(collection: Collection, collection_config: dict) -> dict:
+    """
+    Summarize a collection config and the Plex collection, to detect changes to either since the last sync.
+
+    Args:
+        collection (Collection): Plex collection.
+        collection_config (dict): Config of the collection.
+
+    Returns:
+        dict: Hashes of the config and poster, and the update time and item count of the Plex collection.
+    """
+    config_hash = hashlib.sha256(
+        json.dumps(collection_config, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    poster = collection_config.get("poster")
+    return {
+        "config": config_hash,
+        "poster": _poster_hash(poster) if poster else None,
+        "updatedAt": collection.updatedAt.timestamp() if collection.updatedAt else None,
+        "childCount": collection.childCount,
+    }
+
+
+@functools.lru_cache(maxsize=4096)
+def _clean_title(config_item: str) -> str:
+    """
+    Remove any GUID from a config item, leaving the title.
+
+    Args:
+        config_item (str): Item from a collection config, a title optionally followed by a GUID.
+
+    Returns:
+        str: the item title
+    """
+    return config_item.partition(" plex://")[0].partition(" {")[0]
+
+
+# GUID sources available for each library type, in order of preference, with the tag that starts the id
+_GUID_SOURCES = {
+    "movie": (("tmdb", "{tmdb-"), ("imdb", "{imdb-"), ("plex", "plex://")),
+    "show": (("tvdb", "{tvdb-"), ("tmdb", "{tmdb-"), ("plex", "plex://")),
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_guid(config_item: str, lib_type: str, full: bool) -> str:
+    """
+    Find the GUID in a config item, see PlexCollectionMaker.get_item_guid.
+
+    Raises:
+        KeyError: if lib_type is neither "movie" or "show"
+    """
+    for source, tag in _GUID_SOURCES[lib_type]:
+        start = config_item.rfind(tag)
+        if start == -1:
+            # source not found in config item
+            continue
+        start += len(tag)
+        # Plex guids end at whitespace, other guids at the closing brace
+        end = config_item.find(" " if source == "plex" else "}", start)
+        guid = config_item[start:] if end == -1 else config_item[start:end]
+
+        if full:
+            return f"{source}://{guid}"
+        return guid
+    return "-1"
+
+
+_MAX_WORKERS = 8  # Concurrent requests to the Plex server
+_PAGE_SIZE = 100  # Library items per request
+_DUMP_PAGE_SIZE = 500  # Library items per request when dumping, where the whole library is always needed
+_WRITE_BUFFER_SIZE = 1024 * 1024  # Dump files are written in many small pieces, flush them in large blocks
+
+
+def _parse_date(value: str) -> "Union[datetime.datetime, None]":
+    """
+    Parse a date from Plex XML, like plexapi does for item attributes.
+
+    Args:
+        value (str): Date in the form YYYY-MM-DD.
+
+    Returns:
+        datetime.datetime | None: the date, or None if it isn't a valid date
+    """
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+# Locked item fields included in library dumps with all fields, single value fields and how to read them from the XML
+_DUMP_FIELDS = {
+    "titleSort": str,
+    "originalTitle": str,
+    "contentRating": str,
+    "year": int,
+    "studio": str,
+    "originallyAvailableAt": _parse_date,
+    "summary": str,
+}
+# Tag field names, with the XML element of each tag
+_DUMP_MULTI_FIELDS = {"genre": "Genre", "label": "Label", "collection": "Collection"}
+
+
+def _dump_item_fields(item: "Union[Movie, Show]") -> "dict[str, Union[str, int, datetime.datetime, list[str], None]]":
+    """
+    Read the locked fields of a library item to dump, straight from the item's XML rather than through plexapi's
+    attributes, which also keeps plexapi from reloading the item from the server for missing values.
+
+    Args:
+        item (Movie | Show): Library item.
+
+    Returns:
+        dict[str, str | int | datetime.datetime | list[str] | None]: {field name: value}
+    """
+    data = item._data
+    attrib = data.attrib
+    fields: "dict[str, Union[str, int, datetime.datetime, list[str], None]]" = {}
+    for field in data.iterfind("Field"):
+        name = field.attrib.get("name")
+        cast = _DUMP_FIELDS.get(name)
+        if cast is not None:
+            # plexapi falls back to the title for a missing sort title
+            value = attrib.get(name, attrib.get("title") if name == "titleSort" else None)
+            fields[name] = None if value is None else cast(value)
+            continue
+        tag = _DUMP_MULTI_FIELDS.get(name)
+        if tag is not None:
+            fields[name] = [x.attrib.get("tag") for x in data.iterfind(tag)]
+    return fields
+
+
+# Collection config fields, and the Collection method that applies each, in the order they're applied
+_FIELD_TO_METHOD = {
+    "titleSort": "editSortTitle",
+    "contentRating": "editContentRating",
+    "summary": "editSummary",
+    "labels": "addLabel",
+    "poster": "uploadPoster",
+    "mode": "modeUpdate",
+    "sort": "sortUpdate",
+}
+# Fields set when creating a collection
+_CREATE_FIELDS = tuple(_FIELD_TO_METHOD)
+# Fields synced when editing a collection, labels are synced separately to remove labels not in the config
+_EDIT_FIELDS = tuple(field for field in _FIELD_TO_METHOD if field != "labels")
+# Fields edited with a single request in batch edit mode
+_CREATE_BATCH_FIELDS = ("titleSort", "contentRating", "summary", "labels")
+_EDIT_BATCH_FIELDS = ("titleSort", "contentRating", "summary")
+# Collection mode and sort config values, by the setting stored in Plex
+_MODE_NAMES = {-1: "default", 0: "hide", 1: "hideItems", 2: "showItems"}
+_SORT_NAMES = {0: "release", 1: "alpha", 2: "custom"}
+
+
+def _fetch_all_parallel(section: LibrarySection, page_size: int = _PAGE_SIZE) -> "Iterator[Union[Movie, Show]]":
+    """
+    Fetch all items in a library, requesting the pages concurrently.
+
+    Args:
+        section (LibrarySection): Plex library object.
+        page_size (int, optional): Number of items per request. Defaults to 100.
+
+    Yields:
+        Movie | Show: All library items, in the same order as LibrarySection.all(), as soon as their page arrives
+    """
+    offsets = range(0, section.totalSize, page_size)
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+        pages = executor.map(
+            lambda offset: section.search(
+                libtype=section.TYPE, container_start=offset, container_size=page_size, maxresults=page_size
+            ),
+            offsets
+        )
+        yield from chain.from_iterable(pages)
+
+
+# Strings that can be written as plain YAML scalars, if they don't resolve to another type (eg "yes", "1979", "null").
+# Colons are allowed unless followed by a space, so titles followed by a plex:// guid stay plain. Other indicators
+# like quotes, commas and brackets only matter at the start of a block scalar
+_YAML_PLAIN_STR = re.compile(
+    r"[A-Za-z0-9_.(/]"
+    r"(?:[^\x00-\x1f\x7f-\x9f:#\u2028\u2029\ud800-\udfff\ufeff\ufffe\uffff]|:(?! |$))*"
+    r"(?<! )"
+)
+# Characters that must be escaped in double quoted YAML scalars, anything YAML doesn't allow unescaped
+_YAML_ESCAPE_CHARS = re.compile(
+    r"[^\x20-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd\U00010000-\U0010ffff]|[\"\\]"
+)
+_YAML_ESCAPES = {"\"": "\\\"", "\\": "\\\\", "\n": "\\n", "\t": "\\t", "\r": "\\r"}
+_yaml_resolver = yaml.resolver.Resolver()
+# Longest key PyYAML reads back without the explicit "? " key indicator
+_YAML_MAX_SIMPLE_KEY = 1024
+
+
+def _yaml_escape(match: re.Match) -> str:
+    """
+    Escape a character for a double quoted YAML scalar.
+
+    Args:
+        match (re.Match): Match of a single character that can't appear as is.
+
+    Returns:
+        str: Escape sequence for the character
+    """
+    char = match.group()
+    escape = _YAML_ESCAPES.get(char)
+    if escape is not None:
+        return escape
+    code = ord(char)
+    if code <= 0xFF:
+        return f"\\x{code:02X}"
+    if code <= 0xFFFF:
+        return f"\\u{code:04X}"
+    return f"\\U{code:08X}"
+
+
+def _yaml_scalar(value: "Union[str, int, float, bool, datetime.date, None]") -> str:
+    """
+    Format a value as a YAML scalar, the same value yaml.safe_load would read back.
+
+    Args:
+        value (str | int | float | bool | datetime.date | None): Value to format.
+
+    Raises:
+        TypeError: if the value isn't a scalar
+
+    Returns:
+        str: Plain scalar if possible, otherwise a double quoted scalar
+    """
+    if isinstance(value, str):
+        if (_YAML_PLAIN_STR.fullmatch(value)
+            and _yaml_resolver.resolve(yaml.ScalarNode, value, (True, False)) == "tag:yaml.org,2002:str"
+        ):
+            return value
+        return f'"{_YAML_ESCAPE_CHARS.sub(_yaml_escape, value)}"'
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if value != value:
+            return ".nan"
+        if value in (float("inf"), float("-inf")):
+            return ".inf" if value > 0 else "-.inf"
+        text = repr(value)
+        # YAML floats need a decimal point, 1e+20 would be read back as a string
+        if "." not in text and "e" in text:
+            text = text.replace("e", ".0e", 1)
+        return text
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    raise TypeError(f"Cannot write {type(value).__name__} as a YAML scalar")
+
+
+def _fast_yaml_lines(data: dict, indent: str = "") -> "Iterator[str]":
+    """
+    Format nested dicts of scalars and lists of scalars as block style YAML, with sorted keys like yaml.dump.
+
+    Args:
+        data (dict): Data to format.
+        indent (str, optional): Indent of the keys of data. Defaults to "".
+
+    Raises:
+        TypeError: if data contains a value that isn't a dict, list of scalars, or scalar,
+            or a key too long to write as a simple key
+
+    Yields:
+        str: YAML lines
+    """
+    for key in sorted(data):
+        value = data[key]
+        yaml_key = _yaml_scalar(key)
+        if len(yaml_key) > _YAML_MAX_SIMPLE_KEY:
+            raise TypeError("Key too long for a simple YAML key")
+        if isinstance(value, dict) and value:
+            yield f"{indent}{yaml_key}:\n"
+            yield from _fast_yaml_lines(value, indent + "  ")
+        elif isinstance(value, list) and value:
+            yield f"{indent}{yaml_key}:\n"
+            for list_item in value:
+                yield f"{indent}- {_yaml_scalar(list_item)}\n"
+        elif isinstance(value, (dict, list)):
+            yield f"{indent}{yaml_key}: {'{}' if isinstance(value, dict) else '[]'}\n"
+        else:
+            yield f"{indent}{yaml_key}: {_yaml_scalar(value)}\n"
+
+
+def _fast_yaml_dump(data: dict, f: "TextIO") -> None:
+    """
+    Write a library dump as YAML. The PyYAML emitter is generic and slow, library dumps only contain nested dicts
+    of scalars and lists of scalars, so they are written directly, falling back to yaml.dump for anything else.
+
+    Args:
+        data (dict): Data to write.
+        f (TextIO): File to write to.
+    """
+    try:
+        text = "".join(_fast_yaml_lines(data))
+    except TypeError:
+        yaml.dump(data, f, Dumper=SafeDumper, allow_unicode=True)
+        return
+    f.write(text)
+
+
+def _progress(
+    iterable: "Iterable[_T]", total: int, desc: str, unit: str, position: int = 0
+) -> "tqdm[_T]":
+    """
+    Wrap an iterable in the progress bar shared by the dump and lock commands.
+
+    Args:
+        iterable (Iterable): Items to show progress for.
+        total (int): Number of items.
+        desc (str): Progress bar label, the library name.
+        unit (str): Name of an item.
+        position (int, optional): Line of the progress bar, when showing several at once. Defaults to 0.
+
+    Returns:
+        tqdm: Iterator over the items, updating the progress bar
+    """
+    from tqdm import tqdm
+
+    return tqdm(
+        iterable,
+        total=total,
+        # Refresh at most ~200 times, redrawing per item is slow compared to the work per item in large libraries
+        miniters=max(1, total // 200),
+        mininterval=0.5,
+        # Show the average rate over the whole run, rather than recomputing a moving average on every refresh
+        smoothing=0,
+        ascii=" ░▒█",
+        ncols=100,
+        desc=desc,
+        unit=unit,
+        position=position,
+    )
+
 
+def _write_yaml_dump(path: Path, data: dict) -> None:
+    """
+    Write a library dump to a YAML file.
+
+    Args:
+        path (Path): YAML file to write.
+        data (dict): Data to write.
+    """
+    with open(path, "w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
+        _fast_yaml_dump(data, f)
 
-load_dotenv(override=True)  # Take environment variables from .env
+
+def _json_default(value: object) -> str:
+    """
+    Convert values the json module can't write, for library dumps without orjson.
+
+    Args:
+        value (object): Value to convert.
+
+    Raises:
+        TypeError: if the value isn't a datetime
+
+    Returns:
+        str: Date in the same format orjson writes it
+    """
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot write {type(value).__name__} as JSON")
+
+
+def _write_json_dump(path: Path, data: dict) -> None:
+    """
+    Write a library dump to a JSON file, with orjson if it's installed.
+
+    Args:
+        path (Path): JSON file to write.
+        data (dict): Data to write.
+    """
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+        return
+    with open(path, "w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
+        json.dump(data, f, indent=2, sort_keys=True, ensure_ascii=False, default=_json_default)
 
 
 class PlexCollectionMaker:
     """Create collections in Plex libraries from a text file list of shows or movies."""
-    def __init__(self, edit_collections: bool):
+    __slots__ = (
+        "plex_token",
+        "plex_ip",
+        "plex_pub_ip",
+        "using_public_ip",
+        "plex",
+        "libraries",
+        "collections_config",
+        "library_index",
+        "guid_index",
+        "_item_cache",
+        "_explained_guid",
+        "_session",
+    )
+
+    def __init__(self, edit_collections: bool, cache_responses: bool = False):
         """
         Create collections in Plex libraries from a text file list of shows or movies.
 
         Args:
             edit_collections (bool, optional): If true, load collection config files. If false, skip loading any
                 collection configs.
+            cache_responses (bool, optional): If true, cache Plex server responses on disk for a few minutes, so
+                repeated dumps don't fetch the libraries again. Defaults to False.
         """
+        # Library items already found for config items, {(library name, config item): Plex item}
+        self._item_cache: "dict[tuple[str, str], Union[Movie, Show]]" = {}
+        self._explained_guid = False
+        # {library name: {title: Plex item}} and {library name: {guid: Plex item}},
+        # only built when editing collections
+        self.library_index: "dict[str, dict[str, Union[Movie, Show]]]" = {}
+        self.guid_index: "dict[str, dict[str, Union[Movie, Show]]]" = {}
         self.load_config(edit_collections)
-        self.plex_setup()
+        self.plex_setup(cache_responses)
 
     def load_config(self, edit_collections: bool) -> None:
         """
@@ -40,71 +646,99 @@ class PlexCollectionMaker:
             edit_collections (bool, optional): If true, load collection config files. If false, skip loading any
                 collection configs.
         """
-        self.using_public_ip = False
-        try:
-            self.plex_token = os.environ["PLEX_TOKEN"]
-        except KeyError:
-            sys.exit('Cannot find "PLEX_TOKEN" in .env file. Please consult the README.')
+        from dotenv import load_dotenv
 
-        try:
-            self.plex_ip = os.environ["PLEX_SERVER_IP"]
-        except KeyError:
-            # Fallback to public ip
-            try:
-                self.plex_ip = os.environ["PLEX_SERVER_PUBLIC_IP"]
-                self.using_public_ip = True
-            except KeyError:
-                sys.exit("Cannot find IP address in .env file. Please consult the README.")
-        try:
-            if not self.using_public_ip:
-                self.plex_pub_ip = os.environ["PLEX_SERVER_PUBLIC_IP"]
-            else:
-                self.plex_pub_ip = None
-        except KeyError:
-            # Only local ip given
-            self.plex_pub_ip = None
+        load_dotenv(override=True)  # Take environment variables from .env
+
+        missing_vars = {var for var in _REQUIRED_ENV_VARS if not os.environ.get(var)}
+        if missing_vars:
+            missing_names = ", ".join(f'"{var}"' for var in sorted(missing_vars))
+            sys.exit(f"Cannot find {missing_names} in .env file. Please consult the README.")
+        self.plex_token = os.environ["PLEX_TOKEN"]
+
+        # Fallback to public ip if no local ip given
+        ips = [os.environ[var] for var in _IP_ENV_VARS if os.environ.get(var)]
+        if not ips:
+            sys.exit("Cannot find IP address in .env file. Please consult the README.")
+        self.using_public_ip = not os.environ.get("PLEX_SERVER_IP")
+        self.plex_ip = ips[0]
+        self.plex_pub_ip = ips[1] if len(ips) > 1 else None
 
         # Ensure "http://" at start of ip address
         for ip in [self.plex_ip, self.plex_pub_ip]:
-            if ip and (ip[:7] != "http://") and (ip[:8] != "https://"):
+            if ip and not ip.startswith(_URL_SCHEMES):
                 sys.exit(
                     'Invalid IP address. Ensure IP address begins "http://". '
                     'Please check the server IP addresses in .env, and consult the README.'
                 )
 
-        with open("./config.yml", encoding="utf-8") as config_file:
-            try:
-                config_yaml = yaml.safe_load(config_file)
-            except yaml.YAMLError as err:
-                print(err)
-        self.libraries = [*config_yaml["libraries"]]
+        try:
+            config_yaml = _load_yaml_cached("./config.yml")
+        except yaml.YAMLError as err:
+            print(err)
+        self.libraries = list(config_yaml["libraries"])
 
         self.collections_config = {}
         if edit_collections:
             for lib in config_yaml["libraries"]:
                 for coll_file in config_yaml["libraries"][lib]["collection_files"]:
-                    with open(coll_file["file"], "r", encoding="utf-8") as collection_config_file:
-                        try:
-                            colls = yaml.safe_load(collection_config_file)
-                            if self.collections_config.get(lib):
-                                self.collections_config[lib].update(colls["collections"])
-                            else:
-                                self.collections_config[lib] = colls["collections"]
-                        except yaml.YAMLError as err:
-                            print(err)
+                    try:
+                        colls = _load_yaml_cached(coll_file["file"])
+                        # Merge into a new dict, the parsed file is shared with the YAML cache
+                        self.collections_config.setdefault(lib, {}).update(colls["collections"] or {})
+                    except yaml.YAMLError as err:
+                        print(err)
 
-    def plex_setup(self) -> None:
+    def plex_setup(self, cache_responses: bool = False) -> None:
         """
         Load PlexAPI config and connect to server.
+
+        Args:
+            cache_responses (bool, optional): If true, cache Plex server responses on disk for a few minutes.
+                Requires requests-cache. Defaults to False.
         """
+        import plexapi.exceptions
+        from plexapi.server import PlexServer
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        # Reuse the connection from an earlier instance to the same server, connecting checks the token and identity
+        cache_key = (self.plex_ip, self.plex_pub_ip, self.plex_token, cache_responses)
+        if cache_key in _plex_server_cache:
+            self.plex, self._session = _plex_server_cache[cache_key]
+            return
+
+        # Share one connection pool between both connection attempts and all later requests
+        if cache_responses and requests_cache is not None:
+            # Only reads are cached, keyed by the full URL including the page offset and size
+            self._session = requests_cache.CachedSession(
+                cache_name=_RESPONSE_CACHE_NAME, backend="sqlite", expire_after=300, allowable_methods=("GET",)
+            )
+        else:
+            if cache_responses:
+                print("\033[33mrequests-cache is not installed, Plex server responses will not be cached.\033[0m")
+            self._session = requests.Session()
+        # Retry dropped requests and transient server errors, but not failed connections so the public ip fallback
+        # isn't delayed. If the retries run out, the last response is still returned for plexapi to handle
+        retry = Retry(
+            total=3,
+            connect=0,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retry)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         try:
-            self.plex = PlexServer(self.plex_ip, self.plex_token)
+            self.plex = PlexServer(self.plex_ip, self.plex_token, session=self._session)
         except requests.exceptions.InvalidURL:
             sys.exit("Invalid IP address. Please check the server IP addresses in .env, and consult the README.")
         except requests.exceptions.RequestException:
             if self.plex_pub_ip:
                 try:
-                    self.plex = PlexServer(self.plex_pub_ip, self.plex_token)
+                    self.plex = PlexServer(self.plex_pub_ip, self.plex_token, session=self._session)
                 except requests.exceptions.RequestException:
                     sys.exit(
                         "Unable to connect to Plex server. Please check the server "
@@ -120,6 +754,7 @@ class PlexCollectionMaker:
                 )
         except plexapi.exceptions.Unauthorized:
             sys.exit('Invalid Plex token. Please check the "PLEX_TOKEN" in .env, and consult the README.')
+        _plex_server_cache[cache_key] = (self.plex, self._session)
 
     def get_libraries(self) -> "dict[str, LibrarySection]":
         """
@@ -128,14 +763,45 @@ class PlexCollectionMaker:
         Returns:
             dict[str, LibrarySection]: {library name: Plex library object}
         """
+        import plexapi.exceptions
+
         plex_libraries: "dict[str, LibrarySection]" = {}
         for library in self.libraries:
             try:
                 plex_libraries[library] = self.plex.library.section(library)
             except plexapi.exceptions.NotFound:
                 sys.exit(f'Library named "{library}" not found. Please check the config.yml, and consult the README.')
+
+        if self.collections_config:
+            for lib_name, section in plex_libraries.items():
+                self.guid_index[lib_name], self.library_index[lib_name] = self._build_library_index(section)
         return plex_libraries
 
+    def _build_library_index(
+        self, section: LibrarySection
+    ) -> "tuple[dict[str, Union[Movie, Show]], dict[str, Union[Movie, Show]]]":
+        """
+        Fetch every library item once, shared by collection making and editing,
+        rather than requesting each config item from the Plex server.
+
+        Args:
+            section (LibrarySection): Plex library object.
+
+        Returns:
+            tuple[dict[str, Movie | Show], dict[str, Movie | Show]]: {guid: library item}, with the Plex guid and
+                every agent guid (tmdb://, imdb://, tvdb://) of each item, and {title: library item}
+        """
+        by_guid: "dict[str, Union[Movie, Show]]" = {}
+        by_title: "dict[str, Union[Movie, Show]]" = {}
+        for lib_item in _fetch_all_parallel(section):
+            by_guid.setdefault(lib_item.guid, lib_item)
+            # Read the agent guids from the private XML, the public lib_item.guids would reload every item without
+            # any agent guids from the server, one request per item
+            for item_guid in lib_item._data.iter("Guid"):
+                by_guid.setdefault(item_guid.attrib.get("id"), lib_item)
+            by_title.setdefault(lib_item.title, lib_item)
+        return by_guid, by_title
+
     def get_item_guid(
         self, title: str, lib_type: str, full: bool = False
     ) -> str:
@@ -157,26 +823,81 @@ class PlexCollectionMaker:
             str: the available GUID of the title, returns "-1" if no GUID is available
         """
         try:
-            lib_sources = {
-                "movie": ["tmdb", "imdb", "plex"],
-                "show": ["tvdb", "tmdb", "plex"]
-            }
-            for source in lib_sources[lib_type]:
-                if title.find(source) == -1:
-                    # source not found in title
-                    continue
-                if source == "plex":
-                    guid = title.split(sep="plex://")[-1].split()[0]
-                else:
-                    guid = title.split(sep=f"{{{source}-")[-1].split(sep="}")[0]
-
-                if full:
-                    return f"{source}://{guid}"
-                return guid
-            return "-1"
+            return _parse_guid(title, lib_type, full)
         except KeyError as exc:
+            import plexapi.exceptions
+
             raise plexapi.exceptions.UnknownType from exc
 
+    def _get_item(self, lib_name: str, library: LibrarySection, config_item: str) -> "Union[Movie, Show]":
+        """
+        Find the library item for a config item, reusing items that were already found.
+
+        Args:
+            lib_name (str): Name of the library.
+            library (LibrarySection): Plex library object.
+            config_item (str): Item from a collection config, a title optionally followed by a GUID.
+
+        Raises:
+            plexapi.exceptions.NotFound: if the item isn't in the library
+
+        Returns:
+            Movie | Show: the library item
+        """
+        import plexapi.exceptions
+
+        key = (lib_name, config_item)
+        item = self._item_cache.get(key)
+        if item is not None:
+            return item
+
+        # Find library item using the plex or agent guid, if provided
+        item = self.guid_index[lib_name].get(self.get_item_guid(config_item, library.type, full=True))
+        if item is None:
+            # Fall back to item name, library.get(title) doesn't always return the
+            # actual item with exact title (eg Horror-of-Dracula for Drácula),
+            # so find exact match in the prefetched library items
+            item = self.library_index[lib_name].get(_clean_title(config_item))
+            if item is None:
+                raise plexapi.exceptions.NotFound
+
+            if not self._explained_guid:
+                print(
+                    "\033[33mGUID not available, incorrect matches may occur.\033[0m "
+                    "If incorrect items added to collection, consider dumping library "
+                    "and using given title from output file."
+                )
+                self._explained_guid = True
+        self._item_cache[key] = item
+        return item
+
+    def _resolve_items(
+        self, lib_name: str, library: LibrarySection, config_items: "list[str]"
+    ) -> "list[Union[Movie, Show]]":
+        """
+        Find the library items for a list of config items, warning about any that aren't found.
+
+        Args:
+            lib_name (str): Name of the library.
+            library (LibrarySection): Plex library object.
+            config_items (list[str]): Items from a collection config.
+
+        Returns:
+            list[Movie | Show]: the library items that were found, in config order
+        """
+        import plexapi.exceptions
+
+        items: "list[Union[Movie, Show]]" = []
+        for config_item in config_items:
+            try:
+                items.append(self._get_item(lib_name, library, config_item))
+            except plexapi.exceptions.NotFound:
+                print(
+                    f'\033[33mItem "{config_item.partition(" plex://")[0]}" not found in '
+                    f'"{lib_name}" library.\033[0m'
+                )
+        return items
+
     def make_collections(self, plex_libraries: "dict[str, LibrarySection]") -> "dict[str, list[Collection]]":
         """
         Create new regular collections from config lists.
@@ -187,106 +908,65 @@ class PlexCollectionMaker:
         Returns:
             dict[str, list[Collection]]: {library name: list[Collection]} Preexisting collections to check for updates.
         """
+        import plexapi.exceptions
+
         collections_to_update: "dict[str, list[Collection]]" = {}
-        explained_guid = False
-        for library in plex_libraries.items():
-            collections_to_update[library[0]] = []
+        for lib_name, library in plex_libraries.items():
+            collections_to_update[lib_name] = []
+            lib_config = self.collections_config[lib_name]
             collection_title: str
-            for collection_title in [*self.collections_config[library[0]].keys()]:
+            for collection_title, collection_config in lib_config.items():
                 try:
-                    collection: Collection = library[1].collection(collection_title)
+                    collection: Collection = library.collection(collection_title)
                     # If the collection was found, add to list to update/sync and continue to next in config
-                    collections_to_update[library[0]].append(collection)
+                    collections_to_update[lib_name].append(collection)
                 except plexapi.exceptions.NotFound:
                     # If the collection wasn't found in the library, add items according to config list
-                    print(f'Creating "{collection_title}" collection in "{library[0]}" library...')
-                    collection_items: "list[Movie | Show]" = []
-                    if ("items" in self.collections_config[library[0]][collection_title]
-                        and self.collections_config[library[0]][collection_title]["items"]
-                    ):
-                        config_item: str
-                        for config_item in self.collections_config[library[0]][collection_title]["items"]:
-                            try:
-                                # Find library item using plex guid, if provided
-                                collection_items.append(
-                                    library[1].getGuid(self.get_item_guid(config_item, library[1].type, full=True))
-                                )
-                            except plexapi.exceptions.NotFound:
-                                try:
-                                    # Fall back to item name, library.get(title) doesn't always return the
-                                    # actual item with exact title (eg Horror-of-Dracula for Drácula),
-                                    # so find match in full search
-                                    search = next(
-                                        (
-                                            lib_item for lib_item in plex_libraries[library[0]].search(
-                                                title=config_item.split(' plex://')[0].split(' {')[0]
-                                            ) if lib_item.title == config_item.split(' plex://')[0].split(' {')[0]
-                                        ),
-                                        None
-                                    )
-                                    if search is None:
-                                        raise plexapi.exceptions.NotFound from None
-                                    collection_items.append(search)
-
-                                    if not explained_guid:
-                                        print(
-                                            "\033[33mGUID not available, incorrect matches may occur.\033[0m "
-                                            "If incorrect items added to collection, consider dumping library "
-                                            "and using given title from output file."
-                                        )
-                                        explained_guid = True
-                                except plexapi.exceptions.NotFound:
-                                    print(
-                                        f'\033[33mItem "{config_item.split(" plex://")[0]}" not found in '
-                                        f'"{library[0]}" library.\033[0m'
-                                    )
+                    print(f'Creating "{collection_title}" collection in "{lib_name}" library...')
+                    config_items = collection_config.get("items")
+                    if config_items:
+                        collection_items = self._resolve_items(lib_name, library, config_items)
                         if len(collection_items) > 0:
-                            # Create collection
-                            collection: Collection = library[1].createCollection(
+                            # Create collection with all items in a single request
+                            collection: Collection = library.createCollection(
                                 title=collection_title, items=collection_items
                             )
-                            fields = [
-                                ("titleSort",       collection.editSortTitle),
-                                ("contentRating",   collection.editContentRating),
-                                ("summary",         collection.editSummary),
-                                ("labels",          collection.addLabel),
-                                ("poster",          collection.uploadPoster),
-                                ("mode",            collection.modeUpdate),
-                                ("sort",            collection.sortUpdate)
-                            ]
-                            for field, edit_func in fields:
-                                if (field in self.collections_config[library[0]][collection_title]
-                                    and self.collections_config[library[0]][collection_title][field]
-                                ):
+                            # Save the text field and label edits together in a single request
+                            batch_edits = any(collection_config.get(field) for field in _CREATE_BATCH_FIELDS)
+                            if batch_edits:
+                                collection.batchEdits()
+                            for field in _CREATE_FIELDS:
+                                value = collection_config.get(field)
+                                if value:
+                                    edit_func = getattr(collection, _FIELD_TO_METHOD[field])
                                     if field == "poster":
-                                        if (self.collections_config[
-                                                library[0]][collection_title][field][:7] == "http://"
-                                            or self.collections_config[
-                                                library[0]][collection_title][field][:8] == "https://"
-                                        ):
-                                            edit_func(url=self.collections_config[library[0]][collection_title][field])
+                                        if value.startswith(_URL_SCHEMES):
+                                            edit_func(url=value)
                                         else:
-                                            edit_func(
-                                                filepath=self.collections_config[library[0]][collection_title][field]
-                                            )
+                                            edit_func(filepath=value)
                                     else:
-                                        edit_func(self.collections_config[library[0]][collection_title][field])
+                                        edit_func(value)
+                            if batch_edits:
+                                collection.saveEdits()
                         else:
                             print(
                                 "\033[31mUnable to create collection. "
                                 f'Collection "{collection_title}" for '
-                                f'"{library[0]}" library has no items in config.\033[0m'
+                                f'"{lib_name}" library has no items in config.\033[0m'
                             )
                     else:
                         print(
                             "\033[31mUnable to create collection. "
                             f'Collection "{collection_title}" for '
-                            f'"{library[0]}" library has no items in config.\033[0m'
+                            f'"{lib_name}" library has no items in config.\033[0m'
                         )
         return collections_to_update
 
     def edit_collections(
-        self, plex_libraries: "dict[str, LibrarySection]", collections_to_update: "dict[str, list[Collection]]"
+        self,
+        plex_libraries: "dict[str, LibrarySection]",
+        collections_to_update: "dict[str, list[Collection]]",
+        force_sync: bool = False,
     ):
         """
         Edit existing collections from config lists.
@@ -294,165 +974,194 @@ class PlexCollectionMaker:
         Args:
             plex_libraries (dict[str, LibrarySection]): {library name: Plex library object}
             collections_to_update (dict[str, list[Collection]]): Collections to update
+            force_sync (bool, optional): If true, sync every collection. If false, skip collections where neither the
+                config nor the Plex collection has changed since the last sync. Defaults to False.
         """
-        for lib in collections_to_update.items():
-            for collection_update in lib[1]:
+        sync_state = _read_sync_state()
+        for lib_name, lib_collections in collections_to_update.items():
+            library = plex_libraries[lib_name]
+            lib_type = library.type
+            lib_state = sync_state.setdefault(lib_name, {})
+            collections_to_sync: "list[Collection]" = []
+            for collection_update in lib_collections:
                 if collection_update.smart:
                     print(
                         f'\033[31mUnable to create or update smart collections. '
                         f'Ignoring "{collection_update.title}" collection.\033[0m'
                     )
                     continue
-                print(f'Syncing "{collection_update.title}" in "{lib[0]}" library to config...')
-                if ("items" in self.collections_config[lib[0]][collection_update.title]
-                    and self.collections_config[lib[0]][collection_update.title]["items"]
+                collection_config = self.collections_config[lib_name][collection_update.title]
+                last_state = lib_state.get(collection_update.title)
+                if (
+                    not force_sync
+                    and collection_config.get("items")
+                    and last_state == _collection_state(collection_update, collection_config)
                 ):
+                    print(f'"{collection_update.title}" in "{lib_name}" library is unchanged since last sync.')
+                    continue
+                collections_to_sync.append(collection_update)
+
+            # Fetch the items of the collections to sync concurrently, each is a request to the Plex server.
+            # Fetched once, rather than for every config item and again for removal
+            collections_to_fetch = [
+                c for c in collections_to_sync if self.collections_config[lib_name][c.title].get("items")
+            ]
+            with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+                fetched_items: "dict[str, list[Union[Movie, Show]]]" = dict(
+                    zip(
+                        (c.title for c in collections_to_fetch),
+                        executor.map(lambda c: c.items(), collections_to_fetch),
+                    )
+                )
+
+            for collection_update in collections_to_sync:
+                collection_config = self.collections_config[lib_name][collection_update.title]
+                config_items = collection_config.get("items")
+                print(f'Syncing "{collection_update.title}" in "{lib_name}" library to config...')
+                if config_items:
+                    collection_items = fetched_items[collection_update.title]
+
+                    # Titles on both sides, for comparing the collection and config items
+                    existing_titles = {lib_item.title for lib_item in collection_items}
+                    clean_titles = [_clean_title(config_item) for config_item in config_items]
+                    config_titles = set(clean_titles)
+
                     # Add new items to collection that are in config, but not collection
-                    new_items = []
-                    explained_guid = False
+                    missing_items = []
                     config_item: str
-                    for config_item in self.collections_config[lib[0]][collection_update.title]["items"]:
-                        if (config_item.split(" plex://")[0].split(" {")[0].encode("utf-8") not in
-                            [lib_item.title.encode("utf-8") for lib_item in collection_update.items()]
-                        ):
-                            print(
-                                f'Adding "{config_item.split(" plex://")[0].split(" {")[0]}" '
-                                f'to "{collection_update.title}" collection...'
-                            )
-                            try:
-                                # Find library item using plex guid, if provided
-                                new_items.append(
-                                    plex_libraries[lib[0]].getGuid(
-                                        self.get_item_guid(config_item, plex_libraries[lib[0]].type, full=True)
-                                    )
-                                )
-                            except plexapi.exceptions.NotFound:
-                                try:
-                                    # Fall back to item name, library.get(title) doesn't always return the
-                                    # actual item with exact title (eg Horror-of-Dracula for Drácula),
-                                    # so find match in full search
-                                    search = next(
-                                        (
-                                            lib_item for lib_item in plex_libraries[lib[0]].search(
-                                                title=config_item.split(' plex://')[0].split(' {')[0]
-                                            ) if lib_item.title == config_item.split(' plex://')[0].split(' {')[0]
-                                        ),
-                                        None
-                                    )
-                                    if search is None:
-                                        raise plexapi.exceptions.NotFound from None
-                                    new_items.append(search)
-
-                                    if not explained_guid:
-                                        print(
-                                            "\033[33mGUID not available, incorrect matches may occur.\033[0m "
-                                            "If incorrect items added to collection, consider dumping library "
-                                            "and using given title from output file."
-                                        )
-                                        explained_guid = True
-                                except plexapi.exceptions.NotFound:
-                                    print(
-                                        f'\033[33mItem "{config_item.split(" plex://")[0]}" '
-                                        f'not found in "{plex_libraries[lib[0]].title}" library\033[0m.'
-                                    )
-                    if len(new_items) > 0:
-                        collection_update.addItems(items=new_items)
+                    for config_item, title in zip(config_items, clean_titles):
+                        if title not in existing_titles:
+                            print(f'Adding "{title}" to "{collection_update.title}" collection...')
+                            missing_items.append(config_item)
+                    # Only remember the sync if every config item is in the collection,
+                    # otherwise retry next run in case the missing items have been added to the library
+                    synced_all = True
+                    if missing_items:
+                        new_items = self._resolve_items(lib_name, library, missing_items)
+                        if len(new_items) > 0:
+                            collection_update.addItems(items=new_items)
+                        synced_all = len(new_items) == len(missing_items)
 
-                    # Remove items from collection that are not in config list
+                    # Remove items from collection that are not in config list.
+                    # Build the config lookups once, rather than for every collection item
+                    config_guids = frozenset(
+                        self.get_item_guid(config_item, lib_type) for config_item in config_items
+                    )
+                    # Config items joined, to check if any config item contains a guid with a single search
+                    config_blob = "\n".join(config_items)
                     remove_items = []
                     lib_item: Union[Movie, Show]
-                    for lib_item in collection_update.items():
-                        remove_item_from_coll = True
-                        config_guids = []
-                        config_item: str
-                        for config_item in self.collections_config[lib[0]][collection_update.title]["items"]:
-                            # Get any guids provided for items in config
-                            config_guids.append(self.get_item_guid(config_item, plex_libraries[lib[0]].type))
-
-                            # If item in collection matches an item in the config, don't remove
-                            sg: Guid
-                            for sg in lib_item.guids:
-                                if (config_item.find(sg.id.split("://")[-1]) != -1
-                                    or sg.id.split("://")[-1] in config_guids
-                                ):
-                                    remove_item_from_coll = False
-                            if config_item.find(lib_item.guid) != -1:
-                                remove_item_from_coll = False
+                    for lib_item in collection_items:
+                        # If item in collection matches an item in the config, don't remove
+                        sg: Guid
+                        guid_ids = [sg.id.rpartition("://")[2] for sg in lib_item.guids]
+                        remove_item_from_coll = (
+                            lib_item.guid not in config_blob
+                            and config_guids.isdisjoint(guid_ids)
+                            and not any(guid_id in config_blob for guid_id in guid_ids)
+                        )
 
                         # This is back-up, if name in config doesn't match
                         # the exact title used in Plex, this check will fail
                         remove_item_from_coll = (
-                            remove_item_from_coll
-                            and lib_item.title.encode("utf-8") not in [
-                                config_item.split(" plex://")[0].split(" {")[0].encode("utf-8")
-                                for config_item in self.collections_config[lib[0]][collection_update.title]["items"]
-                            ]
+                            remove_item_from_coll and lib_item.title not in config_titles
                         )
 
                         if remove_item_from_coll:
                             print(f'Removing "{lib_item.title}" from "{collection_update.title}" collection...')
-                            remove_items.append(plex_libraries[lib[0]].getGuid(lib_item.guid))
+                            remove_items.append(lib_item)
                     if len(remove_items) > 0:
                         collection_update.removeItems(items=remove_items)
 
-                    fields = [
-                        ("titleSort",       collection_update.editSortTitle),
-                        ("contentRating",   collection_update.editContentRating),
-                        ("summary",         collection_update.editSummary),
-                        ("poster",          collection_update.uploadPoster),
-                        ("mode",            collection_update.modeUpdate),
-                        ("sort",            collection_update.sortUpdate)
-                    ]
-                    for field, edit_func in fields:
-                        if (field in self.collections_config[lib[0]][collection_update.title]
-                            and self.collections_config[lib[0]][collection_update.title][field]
+                    # Only edit the fields that differ from the collection or aren't locked yet,
+                    # and only upload the poster if it changed since the last sync
+                    current_values = {
+                        "titleSort": collection_update.titleSort,
+                        "contentRating": collection_update.contentRating,
+                        "summary": collection_update.summary,
+                        "poster": None if force_sync else lib_state.get(collection_update.title, {}).get("poster"),
+                        "mode": _MODE_NAMES.get(collection_update.collectionMode),
+                        "sort": _SORT_NAMES.get(collection_update.collectionSort),
+                    }
+                    # Read the locked fields from the XML, collection_update.fields reloads the collection when
+                    # none are locked
+                    locked_fields = {
+                        x.attrib.get("name")
+                        for x in collection_update._data.iterfind("Field")
+                        if x.attrib.get("locked") == "1"
+                    }
+                    edits: "dict[str, str]" = {}
+                    for field in _EDIT_FIELDS:
+                        value = collection_config.get(field)
+                        if value and (
+                            (_poster_hash(value) if field == "poster" else value) != current_values[field]
+                            # Editing a text field also locks it, so Plex metadata refreshes don't overwrite it
+                            or (field in _EDIT_BATCH_FIELDS and field not in locked_fields)
                         ):
-                            if field == "poster":
-                                if (self.collections_config[
-                                        lib[0]][collection_update.title][field][:7] == "http://"
-                                    or self.collections_config[
-                                        lib[0]][collection_update.title][field][:8] == "https://"
-                                ):
-                                    edit_func(url=self.collections_config[lib[0]][collection_update.title][field])
-                                else:
-                                    edit_func(
-                                        filepath=self.collections_config[lib[0]][collection_update.title][field]
-                                    )
-                            else:
-                                edit_func(self.collections_config[lib[0]][collection_update.title][field])
+                            edits[field] = value
                         #TODO if not in config, check locked?, confirm with user to unlock, and revert/rescan?
 
                     # Add/remove labels according to config list
-                    if "labels" in self.collections_config[lib[0]][collection_update.title]:
-                        if self.collections_config[lib[0]][collection_update.title]["labels"]:
-                            new_labels = []
-                            for config_label in self.collections_config[lib[0]][collection_update.title]["labels"]:
-                                if config_label not in [x.tag for x in collection_update.labels]:
+                    new_labels: "list[str]" = []
+                    remove_labels: "list[str]" = []
+                    if "labels" in collection_config:
+                        current_labels = [x.tag for x in collection_update.labels]
+                        config_labels = collection_config["labels"]
+                        if config_labels:
+                            current_label_set = set(current_labels)
+                            config_label_set = set(config_labels)
+                            for config_label in dict.fromkeys(config_labels):
+                                if config_label not in current_label_set:
                                     print(f'Adding "{config_label}" label to "{collection_update.title}" collection...')
                                     new_labels.append(config_label)
-                            if len(new_labels) > 0:
-                                collection_update.addLabel(labels=new_labels)
-                            remove_labels = []
-                            for lib_label in [x.tag for x in collection_update.labels]:
-                                if lib_label not in self.collections_config[lib[0]][collection_update.title]["labels"]:
+                            for lib_label in current_labels:
+                                if lib_label not in config_label_set:
                                     print(
                                         f'Removing "{lib_label}" label from "{collection_update.title}" collection...'
                                     )
                                     remove_labels.append(lib_label)
-                            if len(remove_labels) > 0:
-                                collection_update.removeLabel(labels=remove_labels)
                         else:
                             # Labels section in config, but no tags listed, remove all from library collection
-                            collection_update.removeLabel(
-                                labels=[x.tag for x in collection_update.labels],
-                                locked=False
-                            )
+                            remove_labels = current_labels
+
+                    # Save the text field and label edits together in a single request
+                    batch_edits = len(new_labels) > 0 or len(remove_labels) > 0 or any(
+                        field in edits for field in _EDIT_BATCH_FIELDS
+                    )
+                    if batch_edits:
+                        collection_update.batchEdits()
+                    for field, value in edits.items():
+                        edit_func = getattr(collection_update, _FIELD_TO_METHOD[field])
+                        if field == "poster":
+                            if value.startswith(_URL_SCHEMES):
+                                edit_func(url=value)
+                            else:
+                                edit_func(filepath=value)
+                        else:
+                            edit_func(value)
+                    if len(new_labels) > 0:
+                        collection_update.addLabel(labels=new_labels)
+                    # Adding labels resends the current labels, so a removal in the same request could be undone
+                    if len(remove_labels) > 0 and len(new_labels) == 0:
+                        collection_update.removeLabel(labels=remove_labels, locked=bool(collection_config["labels"]))
+                    if batch_edits:
+                        collection_update.saveEdits()
+                    if len(remove_labels) > 0 and len(new_labels) > 0:
+                        collection_update.removeLabel(labels=remove_labels)
+
+                    if synced_all:
+                        collection_update.reload()
+                        lib_state[collection_update.title] = _collection_state(collection_update, collection_config)
+                    else:
+                        lib_state.pop(collection_update.title, None)
                 else:
                     print(
                         f'\033[31mNo items found in config. Removing collection "{collection_update.title}" '
-                        f'from "{plex_libraries[lib[0]]}" library.\033[0m'
+                        f'from "{library}" library.\033[0m'
                     )
                     collection_update.delete()
+                    lib_state.pop(collection_update.title, None)
+        _write_sync_state(sync_state)
 
     def dump_collections(self, plex_libraries: "dict[str, LibrarySection]") -> Path:
         """
@@ -464,9 +1173,12 @@ class PlexCollectionMaker:
         Returns:
             Path: Output directory where YAML files are saved.
         """
-        for library in plex_libraries.items():
-            library_collections: "list[Collection]" = library[1].collections()
-            lib_dicts: "dict[str, dict[str, dict[str, Union[str, list[str]]]]]" = {}
+        dump_dir = Path("./config_dump")
+        os.makedirs(dump_dir, exist_ok=True)
+        for lib_name, library in plex_libraries.items():
+            # Sorted by title so dumps of an unchanged library are identical, item order is kept as it's the custom sort
+            library_collections: "list[Collection]" = sorted(library.collections(), key=lambda c: c.title)
+            # # Output file layout
             # # lib_dicts = {
             # #     'collections': {
             # #         'collection1': {
@@ -488,141 +1200,171 @@ class PlexCollectionMaker:
             # #     }
             # # }
 
-            mode_dict = {
-                -1: "default",
-                0: "hide",
-                1: "hideItems",
-                2: "showItems"
-            }
-            sort_dict = {
-                0: "release",
-                1: "alpha",
-                2: "custom"
-            }
-            lib_dicts["collections"] = {}
-            for c in tqdm(
-                library_collections,
-                total=len(library_collections),
-                ascii=" ░▒█",
-                ncols=100,
-                desc=library[0],
-                unit="collection"
-            ):
-                lib_dicts["collections"][c.title] = {}
-                fields = [x.name for x in c.fields]
-                lib_dicts["collections"][c.title]["smart"] = c.smart
+            def dump_one(c: Collection) -> "dict[str, Union[str, list[str]]]":
+                collection_dict: "dict[str, Union[str, list[str]]]" = {}
+                fields = {x.name for x in c.fields}
+                collection_dict["smart"] = c.smart
                 if "titleSort" in fields:
-                    lib_dicts["collections"][c.title]["titleSort"] = c.titleSort
+                    collection_dict["titleSort"] = c.titleSort
                 if "label" in fields:
-                    lib_dicts["collections"][c.title]["labels"] = [x.tag for x in c.labels]
+                    collection_dict["labels"] = [x.tag for x in c.labels]
                 if "contentRating" in fields:
-                    lib_dicts["collections"][c.title]["contentRating"] = c.contentRating
+                    collection_dict["contentRating"] = c.contentRating
                 if "summary" in fields:
-                    lib_dicts["collections"][c.title]["summary"] = c.summary
-                # lib_dicts['collections'][c.title]['poster'] = c.posterUrl
-                lib_dicts["collections"][c.title]["mode"] = mode_dict[c.collectionMode]
-                lib_dicts["collections"][c.title]["sort"] = sort_dict[c.collectionSort]
-                lib_dicts["collections"][c.title]["items"] = [f"{x.title} {x.guid}" for x in c.items()]
-
-            os.makedirs("./config_dump", exist_ok=True)
-            config_file = Path(f'./config_dump/{library[0].replace(" ", "_")}_collections.yml')
-            with open(config_file.as_posix(), "w", encoding="utf-8") as f:
-                yaml.dump(lib_dicts, f)
-        return config_file.parent.resolve()
-
-    def dump_libraries(self, plex_libraries: "dict[str, LibrarySection]", all_fields: bool = False) -> Path:
+                    collection_dict["summary"] = c.summary
+                # collection_dict['poster'] = c.posterUrl
+                collection_dict["mode"] = _MODE_NAMES[c.collectionMode]
+                collection_dict["sort"] = _SORT_NAMES[c.collectionSort]
+                collection_dict["items"] = [f"{x.title} {x.guid}" for x in c.items()]
+                return collection_dict
+
+            config_file = dump_dir / f'{lib_name.replace(" ", "_")}_collections.yml'
+            with open(config_file, "w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
+                if not library_collections:
+                    f.write("collections: {}\n")
+                    continue
+                f.write("collections:\n")
+                # Dump the collections concurrently, fetching the items of each is a request to the Plex server.
+                # Each collection is written as soon as it's ready, rather than holding the whole library in memory
+                with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+                    for c, collection_dict in zip(
+                        library_collections,
+                        _progress(
+                            executor.map(dump_one, library_collections),
+                            total=len(library_collections),
+                            desc=lib_name,
+                            unit="collection",
+                        ),
+                    ):
+                        collection_yaml = yaml.dump(
+                            {c.title: collection_dict},
+                            Dumper=SafeDumper,
+                            default_flow_style=False,
+                            sort_keys=False,
+                            width=118,
+                            allow_unicode=True,
+                        )
+                        # Nest under "collections", the width above leaves room for the indent
+                        f.write(textwrap.indent(collection_yaml, "  "))
+        return dump_dir.resolve()
+
+    def dump_libraries(
+        self, plex_libraries: "dict[str, LibrarySection]", all_fields: bool = False, json_format: bool = False
+    ) -> Path:
         """
-        Dump all library items to YAML files.
+        Dump all library items to YAML or JSON files.
 
         Args:
             plex_libraries (dict[str, LibrarySection]): {library name: Plex library object}
             all_fields (bool, optional): Include all locked fields for each library item.
+            json_format (bool, optional): If true, write JSON instead of YAML. Defaults to False.
 
         Returns:
-            Path: Output directory where YAML files are saved.
+            Path: Output directory where the files are saved.
         """
-        for library in plex_libraries.items():
-            if all_fields:
-                lib_dict: "dict[str, dict[Union[str, list[str]]]]" = {}
-                # # lib_dicts = {
-                # #     'library': {
-                # #         'title1 guid1': {
-                # #             'titleSort': 'titleSort',
-                # #             'originalTitle': 'originalTitle',
-                # #             'contentRating': 'contentRating',
-                # #             'year': 'year',
-                # #             'studio': 'studio',
-                # #             'originallyAvailableAt': 'originallyAvailableAt',
-                # #             'summary': 'summary',
-                # #             'genre': [
-                # #                 'genre1',
-                # #                 'genre2',
-                # #                 'genre3'
-                # #             ],
-                # #             'label': [
-                # #                 'label1',
-                # #                 'label2'
-                # #             ],
-                # #             'collection': [
-                # #                 'collection1',
-                # #                 'collection2',
-                # #             ]
-                # #         },
-                # #         'title2 guid2': {}
-                # #     }
-                # # }
-
-                lib_dict[library[0]] = {}
-                item: Union[Movie, Show]
-                for item in tqdm(
-                    library[1].all(),
-                    total=library[1].totalSize,
-                    ascii=" ░▒█",
-                    ncols=100,
-                    desc=library[0],
-                    unit=library[1].type
-                ):
-                    title = f"{item.title} {item.guid}"
-                    lib_dict[library[0]][title] = {}
-
-                    used_fields = [
-                        "titleSort",
-                        "originalTitle",
-                        "contentRating",
-                        "year",
-                        "studio",
-                        "originallyAvailableAt",
-                        "summary"
-                    ]
-                    used_multi_fields = ["genre", "label", "collection"]
-
-                    field: Field
-                    for field in item.fields:
-                        if field.name in used_fields:
-                            lib_dict[library[0]][title][field.name] = getattr(item, field.name)
-                        if field.name in used_multi_fields:
-                            lib_dict[library[0]][title][field.name] = [x.tag for x in getattr(item, field.name+"s")]
-
-            else: # Just a list of movie/show titles and guids
-                lib_dict: "dict[str, list[str]]" = {}
-                lib_dict[library[0]] = [
-                    f"{x.title} {x.guid}" for x in tqdm(
-                        library[1].all(),
-                        total=library[1].totalSize,
-                        ascii=" ░▒█",
-                        ncols=100,
-                        desc=library[0],
-                        unit=library[1].type
-                    )
-                ]
+        dump_dir = Path("./library_dump")
+        os.makedirs(dump_dir, exist_ok=True)
+        # Dump the libraries concurrently, each is mostly waiting on the Plex server
+        with ThreadPoolExecutor(max_workers=min(_MAX_WORKERS, len(plex_libraries)) or 1) as executor:
+            futures = [
+                executor.submit(self._dump_one_library, lib_name, library, position, dump_dir, all_fields, json_format)
+                for position, (lib_name, library) in enumerate(plex_libraries.items())
+            ]
+            for future in futures:
+                # Raise any errors from the dumps
+                future.result()
+        return dump_dir.resolve()
 
-            os.makedirs("./library_dump", exist_ok=True)
-            library_dump_file = Path(
-                f'./library_dump/{library[0].replace(" ", "_")}{"_(all_fields)" if all_fields else ""}.yml'
-            )
-            with open(library_dump_file.as_posix(), "w", encoding="utf-8") as f:
-                yaml.dump(lib_dict, f)
-        return library_dump_file.parent.resolve()
+    def _dump_one_library(
+        self,
+        lib_name: str,
+        library: LibrarySection,
+        position: int,
+        dump_dir: Path,
+        all_fields: bool = False,
+        json_format: bool = False,
+    ) -> Path:
+        """
+        Dump all items of a library to a YAML or JSON file.
+
+        Args:
+            lib_name (str): Name of the library.
+            library (LibrarySection): Plex library object.
+            position (int): Line of the library's progress bar, when dumping libraries concurrently.
+            dump_dir (Path): Output directory.
+            all_fields (bool, optional): Include all locked fields for each library item.
+            json_format (bool, optional): If true, write JSON instead of YAML. Defaults to False.
+
+        Returns:
+            Path: File the library was dumped to.
+        """
+        lib_items: "Iterator[Union[Movie, Show]]" = _progress(
+            _fetch_all_parallel(library, page_size=_DUMP_PAGE_SIZE),
+            total=library.totalSize,
+            desc=lib_name,
+            unit=library.type,
+            position=position,
+        )
+        file_stem = f'{lib_name.replace(" ", "_")}{"_(all_fields)" if all_fields else ""}'
+
+        if all_fields:
+            lib_dict: "dict[str, dict[Union[str, list[str]]]]" = {}
+            # # lib_dicts = {
+            # #     'library': {
+            # #         'title1 guid1': {
+            # #             'titleSort': 'titleSort',
+            # #             'originalTitle': 'originalTitle',
+            # #             'contentRating': 'contentRating',
+            # #             'year': 'year',
+            # #             'studio': 'studio',
+            # #             'originallyAvailableAt': 'originallyAvailableAt',
+            # #             'summary': 'summary',
+            # #             'genre': [
+            # #                 'genre1',
+            # #                 'genre2',
+            # #                 'genre3'
+            # #             ],
+            # #             'label': [
+            # #                 'label1',
+            # #                 'label2'
+            # #             ],
+            # #             'collection': [
+            # #                 'collection1',
+            # #                 'collection2',
+            # #             ]
+            # #         },
+            # #         'title2 guid2': {}
+            # #     }
+            # # }
+
+            item_dicts: "dict[str, dict[str, Union[str, int, datetime.datetime, list[str], None]]]" = {}
+            lib_dict[lib_name] = item_dicts
+            item: Union[Movie, Show]
+            for item in lib_items:
+                item_dicts[f"{item.title} {item.guid}"] = _dump_item_fields(item)
+
+            if json_format:
+                library_dump_file = dump_dir / f"{file_stem}.json"
+                _write_json_dump(library_dump_file, lib_dict)
+            else:
+                library_dump_file = dump_dir / f"{file_stem}.yml"
+                _write_yaml_dump(library_dump_file, lib_dict)
+
+        elif json_format: # Just a list of movie/show titles and guids
+            library_dump_file = dump_dir / f"{file_stem}.json"
+            _write_json_dump(library_dump_file, {lib_name: [f"{x.title} {x.guid}" for x in lib_items]})
+
+        else: # Just a list of movie/show titles and guids
+            library_dump_file = dump_dir / f"{file_stem}.yml"
+            with open(library_dump_file, "w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
+                if not library.totalSize:
+                    lib_items.close()
+                    f.write(f"{_yaml_scalar(lib_name)}: []\n")
+                else:
+                    # Write each title as it's fetched, the list is the whole file so there's nothing to sort
+                    f.write(f"{_yaml_scalar(lib_name)}:\n")
+                    f.writelines(f"- {_yaml_scalar(f'{x.title} {x.guid}')}\n" for x in lib_items)
+        return library_dump_file
 
     def lock_posters(self, plex_libraries: "dict[str, LibrarySection]") -> None:
         """
@@ -631,16 +1373,9 @@ class PlexCollectionMaker:
         Args:
             plex_libraries (dict[str, LibrarySection]): {library name: Plex library object}
         """
-        for library in plex_libraries.items():
+        for lib_name, library in plex_libraries.items():
             item: Union[Movie, Show]
-            for item in tqdm(
-                library[1].all(),
-                total=library[1].totalSize,
-                ascii=" ░▒█",
-                ncols=100,
-                desc=library[0],
-                unit=library[1].type
-            ):
+            for item in _progress(library.all(), total=library.totalSize, desc=lib_name, unit=library.type):
                 item.lockPoster()
                 item.lockArt()
 
@@ -651,27 +1386,36 @@ def main(
     dump_libraries: bool = False,
     all_fields: bool = False,
     lock_posters: bool = False,
+    force_sync: bool = False,
+    cache_responses: bool = False,
+    json_format: bool = False,
 ) -> None:
     """
     Function to run script logic.
     """
-    pcm = PlexCollectionMaker(edit_collections=edit_collections)
+    if cache_responses and edit_collections:
+        # Cached reads could miss the changes made while syncing
+        print("\033[33mResponse caching is only used with --exclude-edit, ignoring --cache-responses.\033[0m")
+        cache_responses = False
+    pcm = PlexCollectionMaker(edit_collections=edit_collections, cache_responses=cache_responses)
 
     plex_libraries = pcm.get_libraries()
 
-    print("Found Plex libraries: ", end="")
-    print(*plex_libraries.keys(), sep=", ")
+    # Write the summary in one go, rather than a console write per line
+    summary = ["Found Plex libraries: " + ", ".join(plex_libraries)]
     if edit_collections:
-        print("Found collection configs:")
-        for lib in plex_libraries.items():
-            print(f"  {lib[0]}: ", end="")
-            print(*pcm.collections_config[lib[0]].keys(), sep=", ")
-    print()
+        summary.append("Found collection configs:")
+        for lib_name in plex_libraries:
+            summary.append(f"  {lib_name}: " + ", ".join(pcm.collections_config[lib_name]))
+    summary.append("\n")
+    sys.stdout.write("\n".join(summary))
 
     if edit_collections:
         collections_to_update = pcm.make_collections(plex_libraries=plex_libraries)
 
-        pcm.edit_collections(plex_libraries=plex_libraries, collections_to_update=collections_to_update)
+        pcm.edit_collections(
+            plex_libraries=plex_libraries, collections_to_update=collections_to_update, force_sync=force_sync
+        )
 
         print("Collections updated.")
 
@@ -682,8 +1426,8 @@ def main(
 
     if dump_libraries:
         print("Dumping existing library items to file...")
-        stem = pcm.dump_libraries(plex_libraries=plex_libraries, all_fields=all_fields)
-        print(f'Complete. YAML files at "{stem}".')
+        stem = pcm.dump_libraries(plex_libraries=plex_libraries, all_fields=all_fields, json_format=json_format)
+        print(f'Complete. {"JSON" if json_format else "YAML"} files at "{stem}".')
 
     if lock_posters:
         print("Locking posters and background art...")
@@ -698,7 +1442,18 @@ if __name__ == "__main__":
     parser.add_argument("-l", "--dump-libraries", action="store_true", help="dump libraries to file")
     parser.add_argument("-a", "--all-fields", action="store_true", help="include all fields when dumping libraries")
     parser.add_argument("-p", "--lock-posters", action="store_true", help="lock all poster and background art fields")
+    parser.add_argument(
+        "-f", "--force-sync", action="store_true", help="sync every collection, even if unchanged since the last sync"
+    )
+    parser.add_argument(
+        "--cache-responses",
+        action="store_true",
+        help="cache Plex server responses for 5 minutes when not editing, requires requests-cache",
+    )
+    parser.add_argument("--json", action="store_true", help="dump libraries as JSON instead of YAML, with -l")
     args = parser.parse_args()
+    if args.json and not args.dump_libraries:
+        parser.error("--json only applies to library dumps, use it with -l/--dump-libraries")
 
     main(
         edit_collections=args.exclude_edit,
@@ -706,4 +1461,7 @@ if __name__ == "__main__":
         dump_libraries=args.dump_libraries,
         all_fields=args.all_fields,
         lock_posters=args.lock_posters,
+        force_sync=args.force_sync,
+        cache_responses=args.cache_responses,
+        json_format=args.json,
     )